@@ -3,6 +3,11 @@ Configuration settings for Solar Challenge
 Centralized configuration for data processing and analysis
 """
 
+import functools
+import sys
+import types
+from pathlib import PurePosixPath
+
 # Data Processing Settings
 DATA_SETTINGS = {
     'timestamp_column': 'Timestamp',
@@ -47,7 +52,7 @@ FILE_SETTINGS = {
 }
 
 # Country-specific settings
-COUNTRIES = {
+_COUNTRIES = {
     'Benin': {
         'file': 'benin-malanville.csv',
         'cleaned_file': 'benin_clean.csv',
@@ -65,6 +70,28 @@ COUNTRIES = {
     }
 }
 
+# Read-only view with interned country names and file names
+COUNTRIES = types.MappingProxyType({
+    sys.intern(country): {
+        key: sys.intern(value) if isinstance(value, str) else value
+        for key, value in info.items()
+    }
+    for country, info in _COUNTRIES.items()
+})
+_ALL_COUNTRIES = tuple(COUNTRIES)
+
+def _build_country_paths(data_dir):
+    """Build {country: (raw_filepath, cleaned_filepath)} for a data directory"""
+    base = PurePosixPath(data_dir)
+    return {
+        country: (str(base / info['file']), str(base / info['cleaned_file']))
+        for country, info in COUNTRIES.items()
+    }
+
+# Paths under the default data directory, resolved once at import
+_COUNTRY_PATHS = _build_country_paths(FILE_SETTINGS['data_directory'])
+
+@functools.lru_cache(maxsize=None)
 def get_country_filepath(country, data_dir=None):
     """
     Get filepath for a country's data
@@ -76,21 +103,19 @@ def get_country_filepath(country, data_dir=None):
     Returns:
         tuple: (raw_filepath, cleaned_filepath)
     """
-    if data_dir is None:
-        data_dir = FILE_SETTINGS['data_directory']
-    
-    country_info = COUNTRIES.get(country)
-    if not country_info:
+    if country not in _COUNTRY_PATHS:
         raise ValueError(f"Unknown country: {country}")
     
-    raw_path = f"{data_dir}/{country_info['file']}"
-    cleaned_path = f"{data_dir}/{country_info['cleaned_file']}"
+    if data_dir is None or data_dir == FILE_SETTINGS['data_directory']:
+        return _COUNTRY_PATHS[country]
     
-    return raw_path, cleaned_path
+    country_info = COUNTRIES[country]
+    base = PurePosixPath(data_dir)
+    return str(base / country_info['file']), str(base / country_info['cleaned_file'])
 
 def get_all_countries():
     """Get list of all available countries"""
-    return list(COUNTRIES.keys())
+    return list(_ALL_COUNTRIES)
 
 def validate_settings():
     """Validate all configuration settings"""
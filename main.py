@@ -7,47 +7,52 @@ Orchestrates the complete data processing and analysis pipeline
 import os
 import sys
 import argparse
-from datetime import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add the current directory to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from scripts.data_processing import batch_process_countries, load_and_clean_data
-from scripts.visualization import create_analysis_report
-from scripts.analysis import analyze_solar_data, SolarAnalyzer
-from config.settings import COUNTRIES, FILE_SETTINGS, validate_settings
+from config.settings import COUNTRIES, FILE_SETTINGS, get_country_filepath, validate_settings
+
+# Directory settings resolved once at import
+DATA_DIR = FILE_SETTINGS['data_directory']
+OUTPUT_DIR = FILE_SETTINGS['output_directory']
+REPORTS_DIR = FILE_SETTINGS['reports_directory']
 
 def setup_directories():
     """Create necessary directories"""
-    directories = [
-        FILE_SETTINGS['data_directory'],
-        FILE_SETTINGS['output_directory'], 
-        FILE_SETTINGS['reports_directory']
-    ]
+    directories = [DATA_DIR, OUTPUT_DIR, REPORTS_DIR]
     
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
         print(f"✅ Created directory: {directory}")
 
-def process_individual_country(country, data_dir=None):
+def process_individual_country(country, data_dir=None, engine=None):
     """
     Process data for a single country
     
     Args:
         country (str): Country name
         data_dir (str): Data directory path
+        engine (str): CSV parser engine (e.g. 'pyarrow' or 'polars')
     """
+    # Heavy pandas/matplotlib modules are only imported when data is processed;
+    # reports are only written to disk, so skip loading a GUI backend
+    import matplotlib
+    matplotlib.use('Agg')
+    from scripts.data_processing import load_and_clean_data
+    from scripts.visualization import create_analysis_report
+    
     if data_dir is None:
-        data_dir = FILE_SETTINGS['data_directory']
+        data_dir = DATA_DIR
     
-    country_info = COUNTRIES.get(country)
-    if not country_info:
+    try:
+        input_file, output_file = get_country_filepath(country, data_dir)
+    except ValueError:
         print(f"❌ Unknown country: {country}")
         return None
     
-    input_file = os.path.join(data_dir, country_info['file'])
-    output_file = os.path.join(data_dir, country_info['cleaned_file'])
-    
     if not os.path.exists(input_file):
         print(f"❌ Input file not found: {input_file}")
         return None
@@ -57,35 +62,53 @@ def process_individual_country(country, data_dir=None):
     print(f"{'='*50}")
     
     # Load and clean data
-    df_cleaned = load_and_clean_data(input_file, output_file, country)
+    df_cleaned = load_and_clean_data(input_file, output_file, country, engine=engine)
     
     if df_cleaned is not None:
         # Create analysis report
-        create_analysis_report(df_cleaned, country, FILE_SETTINGS['reports_directory'])
+        create_analysis_report(df_cleaned, country, REPORTS_DIR)
         print(f"✅ Successfully processed {country}")
         return df_cleaned
     else:
         print(f"❌ Failed to process {country}")
         return None
 
-def process_all_countries(data_dir=None):
+def process_all_countries(data_dir=None, engine=None):
     """
     Process data for all countries
     
     Args:
         data_dir (str): Data directory path
+        engine (str): CSV parser engine (e.g. 'pyarrow' or 'polars')
     """
     if data_dir is None:
-        data_dir = FILE_SETTINGS['data_directory']
+        data_dir = DATA_DIR
     
     print("\n" + "="*60)
     print("🌍 BATCH PROCESSING ALL COUNTRIES")
     print("="*60)
     
+    _COUNTRIES = COUNTRIES
+    results = {}
+    
+    # Countries are independent, so each one is processed in its own worker
+    max_workers = min(len(_COUNTRIES), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_individual_country, country, data_dir, engine): country
+            for country in _COUNTRIES
+        }
+        for future in as_completed(futures):
+            country = futures[future]
+            try:
+                results[country] = future.result()
+            except Exception as e:
+                print(f"❌ Failed to process {country}: {e}")
+    
+    # Keep the configured country order regardless of completion order
     country_data = {}
-    
-    for country in COUNTRIES.keys():
-        df = process_individual_country(country, data_dir)
+    for country in _COUNTRIES:
+        df = results.get(country)
         if df is not None:
             country_data[country] = df
     
@@ -106,6 +129,8 @@ def run_comparative_analysis(country_data):
     print("📊 RUNNING COMPARATIVE ANALYSIS")
     print("="*60)
     
+    from scripts.analysis import SolarAnalyzer
+    
     analyzer = SolarAnalyzer()
     insights = analyzer.generate_insights_report(country_data)
     
@@ -120,31 +145,37 @@ def generate_final_report(insights, output_dir=None):
         output_dir (str): Output directory
     """
     if output_dir is None:
-        output_dir = FILE_SETTINGS['output_directory']
+        output_dir = OUTPUT_DIR
     
-    report_file = os.path.join(output_dir, f"final_analysis_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    now = time.localtime()
+    report_file = os.path.join(output_dir, f"final_analysis_report_{time.strftime('%Y%m%d_%H%M%S', now)}.txt")
     
-    with open(report_file, 'w') as f:
-        f.write("SOLAR DATA CHALLENGE - FINAL ANALYSIS REPORT\n")
-        f.write("=" * 50 + "\n\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
-        if insights and 'top_country' in insights:
-            f.write("PRIMARY RECOMMENDATION:\n")
-            f.write(f"• Recommended Country: {insights['top_country']}\n")
-            f.write(f"• Statistical Significance: {insights['statistical_significance']}\n\n")
-            
-            f.write("COUNTRY RANKINGS:\n")
-            for i, (country, scores) in enumerate(insights['rankings'].items(), 1):
-                f.write(f"{i}. {country} (Score: {scores['composite_score']:.2f})\n")
-                f.write(f"   - Average GHI: {scores['average_ghi']:.2f} W/m²\n")
-                f.write(f"   - Consistency: {scores['consistency']:.2f}%\n")
-                f.write(f"   - High Potential Hours: {scores['high_potential_hours']}\n\n")
+    parts = [
+        "SOLAR DATA CHALLENGE - FINAL ANALYSIS REPORT\n",
+        "=" * 50 + "\n\n",
+        f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S', now)}\n\n"
+    ]
+    
+    if insights and 'top_country' in insights:
+        parts.append("PRIMARY RECOMMENDATION:\n")
+        parts.append(f"• Recommended Country: {insights['top_country']}\n")
+        parts.append(f"• Statistical Significance: {insights['statistical_significance']}\n\n")
         
-        f.write("METHODOLOGY:\n")
-        f.write("• Data cleaning: Missing value imputation, outlier removal\n")
-        f.write("• Statistical testing: ANOVA, Kruskal-Wallis\n")
-        f.write("• Ranking: Composite scoring (GHI, consistency, operational hours)\n")
+        parts.append("COUNTRY RANKINGS:\n")
+        for i, (country, scores) in enumerate(insights['rankings'].items(), 1):
+            parts.append(f"{i}. {country} (Score: {scores['composite_score']:.2f})\n")
+            parts.append(f"   - Average GHI: {scores['average_ghi']:.2f} W/m²\n")
+            parts.append(f"   - Consistency: {scores['consistency']:.2f}%\n")
+            parts.append(f"   - High Potential Hours: {scores['high_potential_hours']}\n\n")
+    
+    parts.append("METHODOLOGY:\n")
+    parts.append("• Data cleaning: Missing value imputation, outlier removal\n")
+    parts.append("• Statistical testing: ANOVA, Kruskal-Wallis\n")
+    parts.append("• Ranking: Composite scoring (GHI, consistency, operational hours)\n")
+    
+    # Assemble the report in memory and write it in one call
+    with open(report_file, 'w', buffering=1 << 20) as f:
+        f.write("".join(parts))
     
     print(f"💾 Final report saved: {report_file}")
 
@@ -153,8 +184,10 @@ def main():
     parser = argparse.ArgumentParser(description='Solar Data Challenge Pipeline')
     parser.add_argument('--country', type=str, help='Process specific country')
     parser.add_argument('--all', action='store_true', help='Process all countries')
-    parser.add_argument('--data-dir', type=str, default='data', help='Data directory')
+    parser.add_argument('--data-dir', type=str, default=DATA_DIR, help='Data directory')
     parser.add_argument('--analyze', action='store_true', help='Run comparative analysis')
+    parser.add_argument('--engine', type=str, choices=['c', 'python', 'pyarrow', 'polars'], default=None,
+                        help='CSV parser engine (pyarrow and polars are multithreaded and must be installed)')
     
     args = parser.parse_args()
     
@@ -170,13 +203,13 @@ def main():
     
     if args.country:
         # Process specific country
-        df = process_individual_country(args.country, args.data_dir)
+        df = process_individual_country(args.country, args.data_dir, args.engine)
         if df is not None:
             country_data[args.country] = df
     
     elif args.all or (not args.country and not args.analyze):
         # Process all countries
-        country_data = process_all_countries(args.data_dir)
+        country_data = process_all_countries(args.data_dir, args.engine)
     
     # Run analysis if requested or if we have data
     if args.analyze or country_data:
@@ -186,9 +219,9 @@ def main():
     
     print("\n🎉 PIPELINE EXECUTION COMPLETED!")
     print("📁 Check the following directories for outputs:")
-    print(f"   • Data: {FILE_SETTINGS['data_directory']}/")
-    print(f"   • Reports: {FILE_SETTINGS['reports_directory']}/")
-    print(f"   • Outputs: {FILE_SETTINGS['output_directory']}/")
+    print(f"   • Data: {DATA_DIR}/")
+    print(f"   • Reports: {REPORTS_DIR}/")
+    print(f"   • Outputs: {OUTPUT_DIR}/")
 
 if __name__ == "__main__":
     main()
@@ -17,8 +17,7 @@ def run_quick_start():
     print("=====================================")
     
     # Import after path modification
-    from main import process_all_countries, run_comparative_analysis, generate_final_report
-    from config.settings import FILE_SETTINGS
+    from main import process_all_countries, run_comparative_analysis, generate_final_report, OUTPUT_DIR
     
     try:
         # Process all countries
@@ -34,7 +33,7 @@ def run_quick_start():
         generate_final_report(insights)
         
         print("\n✅ QUICK START COMPLETED SUCCESSFULLY!")
-        print(f"📂 Outputs available in: {FILE_SETTINGS['output_directory']}/")
+        print(f"📂 Outputs available in: {OUTPUT_DIR}/")
         
     except Exception as e:
         print(f"❌ Error during quick start: {e}")
@@ -0,0 +1,67 @@
+"""
+Numerical kernels for Solar Challenge
+Single-pass column statistics, JIT-compiled with Numba when it is available
+"""
+
+import warnings
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; fall back to NumPy reductions
+    njit = None
+
+def _col_stats_numpy(arr):
+    """NumPy fallback for col_stats"""
+    count = np.count_nonzero(~np.isnan(arr), axis=0)
+    with warnings.catch_warnings():
+        # All-NaN columns yield NaN statistics, as in the Numba kernel
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(arr, axis=0, dtype=np.float64)
+        std = np.nanstd(arr, axis=0, dtype=np.float64)
+    return count, mean, std
+
+if njit is not None:
+    # fastmath is left off on purpose: it lets LLVM assume there are no NaNs,
+    # which would break the NaN skipping below
+    @njit(parallel=True, cache=True)
+    def _col_stats_numba(arr):
+        n_rows, n_cols = arr.shape
+        count = np.zeros(n_cols, dtype=np.int64)
+        mean = np.full(n_cols, np.nan)
+        std = np.full(n_cols, np.nan)
+        for c in prange(n_cols):
+            n = 0
+            m = 0.0
+            m2 = 0.0
+            for i in range(n_rows):
+                x = arr[i, c]
+                if not np.isnan(x):
+                    # Welford's recurrence, accumulated in float64
+                    n += 1
+                    delta = x - m
+                    m += delta / n
+                    m2 += delta * (x - m)
+            count[c] = n
+            if n > 0:
+                mean[c] = m
+                std[c] = np.sqrt(m2 / n)
+        return count, mean, std
+
+def col_stats(arr):
+    """
+    Per-column count, mean and population std of a 2D array, ignoring NaNs
+    
+    With Numba installed this is one parallel pass over the data (one
+    thread per column); otherwise it falls back to NumPy reductions.
+    
+    Args:
+        arr (ndarray): 2D float array of shape (rows, columns)
+    
+    Returns:
+        tuple: (count, mean, std) arrays, one entry per column
+    """
+    if njit is not None:
+        # Column-major layout keeps each column's scan contiguous
+        return _col_stats_numba(np.asfortranarray(arr))
+    return _col_stats_numpy(arr)
@@ -5,16 +5,39 @@ Modular functions for statistical testing and insights
 
 import pandas as pd
 import numpy as np
-from scipy import stats
-from scipy.stats import f_oneway, kruskal
-import warnings
-warnings.filterwarnings('ignore')
+
+def _partition_quantile(values, q):
+    """
+    Quantile of a NaN-free 1-D array using partial selection
+    
+    Uses np.partition (O(n)) instead of a full sort and interpolates
+    linearly between the neighbouring order statistics, matching
+    pandas Series.quantile.
+    """
+    pos = q * (values.size - 1)
+    lo = int(pos)
+    hi = min(lo + 1, values.size - 1)
+    part = np.partition(values, (lo, hi))
+    return part[lo] + (part[hi] - part[lo]) * (pos - lo)
+
+def _composite_score(average_ghi, cv_ghi, high_potential_hours, peak_95th):
+    """
+    Weighted composite solar potential score
+    
+    Works on scalars or NumPy arrays. The consistency term
+    0.3 * (100 - cv_ghi) is folded into 30 - 0.3 * cv_ghi.
+    """
+    return (
+        0.4 * average_ghi +             # GHI most important
+        30.0 - 0.3 * cv_ghi +           # Consistency important
+        0.2 * high_potential_hours +    # Operational hours
+        0.1 * peak_95th                 # Peak performance
+    )
 
 class SolarAnalyzer:
     """Class for statistical analysis of solar data"""
     
-    def __init__(self):
-        self.analysis_results = {}
+    __slots__ = ()
     
     def calculate_summary_statistics(self, df, country_name=None):
         """
@@ -27,17 +50,22 @@ class SolarAnalyzer:
         Returns:
             dict: Summary statistics
         """
-        numeric_columns = df.select_dtypes(include=[np.number]).columns
+        numeric_columns = self._numeric_cols(df)
+        
+        # One batched agg() call plus a single quantile() call for both quartiles
+        numeric_df = df[numeric_columns]
+        stats_df = numeric_df.agg(['count', 'mean', 'median', 'std', 'min', 'max'])
+        quartiles = numeric_df.quantile([0.25, 0.75])
         
         summary = {
-            'count': df[numeric_columns].count(),
-            'mean': df[numeric_columns].mean(),
-            'median': df[numeric_columns].median(),
-            'std': df[numeric_columns].std(),
-            'min': df[numeric_columns].min(),
-            'max': df[numeric_columns].max(),
-            'q25': df[numeric_columns].quantile(0.25),
-            'q75': df[numeric_columns].quantile(0.75)
+            'count': stats_df.loc['count'].astype('int64'),  # agg() upcasts it to float
+            'mean': stats_df.loc['mean'],
+            'median': stats_df.loc['median'],
+            'std': stats_df.loc['std'],
+            'min': stats_df.loc['min'],
+            'max': stats_df.loc['max'],
+            'q25': quartiles.loc[0.25],
+            'q75': quartiles.loc[0.75]
         }
         
         if country_name:
@@ -66,8 +94,9 @@ class SolarAnalyzer:
             print(f"❌ Target column {target_column} not found")
             return {}
         
-        numeric_df = df.select_dtypes(include=[np.number])
-        correlations = numeric_df.corr()[target_column].sort_values(ascending=False)
+        numeric_df = df[self._numeric_cols(df)]
+        correlations = self._target_correlations(numeric_df, target_column)
+        correlations = correlations.sort_values(ascending=False)
         
         significant_correlations = {}
         for col, corr in correlations.items():
@@ -81,12 +110,51 @@ class SolarAnalyzer:
         
         return significant_correlations
     
+    def _numeric_cols(self, df):
+        """
+        Get the numeric columns of a DataFrame
+        
+        Not cached across calls: columns can be added to the same frame in
+        place, so each public method resolves them once for its own call.
+        """
+        return df.select_dtypes(include=[np.number]).columns
+    
+    def _target_correlations(self, numeric_df, target_column):
+        """
+        Pearson correlation of every numeric column with the target column only
+        
+        Equivalent to numeric_df.corr()[target_column] without building the
+        full K x K matrix. Rows with NaN are excluded pairwise, as in pandas.
+        """
+        values = numeric_df.to_numpy(dtype=np.float64)
+        target = values[:, numeric_df.columns.get_loc(target_column)]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if not np.isnan(values).any():
+                centered = values - values.mean(axis=0)
+                target_centered = target - target.mean()
+                corr = (centered.T @ target_centered) / (
+                    np.linalg.norm(centered, axis=0) * np.linalg.norm(target_centered)
+                )
+            else:
+                corr = np.full(values.shape[1], np.nan)
+                target_valid = ~np.isnan(target)
+                for j in range(values.shape[1]):
+                    valid = target_valid & ~np.isnan(values[:, j])
+                    if valid.sum() < 2:
+                        continue
+                    x = values[valid, j] - values[valid, j].mean()
+                    y = target[valid] - target[valid].mean()
+                    corr[j] = np.dot(x, y) / (np.linalg.norm(x) * np.linalg.norm(y))
+        
+        return pd.Series(corr, index=numeric_df.columns)
+    
     def compare_countries_statistical(self, country_data_dict, metric='GHI'):
         """
         Perform statistical comparison between countries
         
         Args:
-            country_data_dict (dict): {country_name: dataframe}
+            country_data_dict (dict): {country_name: dataframe or metric array}
             metric (str): Metric to compare
             
         Returns:
@@ -95,18 +163,24 @@ class SolarAnalyzer:
         # Prepare data for testing
         country_samples = {}
         for country, df in country_data_dict.items():
-            if metric in df.columns:
-                country_samples[country] = df[metric].dropna()
+            if isinstance(df, np.ndarray) or metric in df.columns:
+                country_samples[country] = self._clean(df, metric)
         
         if len(country_samples) < 2:
             print("❌ Need at least 2 countries for comparison")
             return {}
         
+        # scipy is only needed here, so it is imported on first use
+        from scipy.stats import f_oneway, kruskal
+        
+        # Materialize the groups once and share them between both tests
+        groups = list(country_samples.values())
+        
         # One-way ANOVA
-        anova_result = f_oneway(*country_samples.values())
+        anova_result = f_oneway(*groups)
         
         # Kruskal-Wallis (non-parametric alternative)
-        kruskal_result = kruskal(*country_samples.values())
+        kruskal_result = kruskal(*groups)
         
         results = {
             'countries': list(country_samples.keys()),
@@ -123,17 +197,19 @@ class SolarAnalyzer:
             }
         }
         
-        print(f"📈 Statistical Comparison for {metric}:")
-        print(f"   • Countries: {', '.join(results['countries'])}")
-        print(f"   • ANOVA F-statistic: {results['anova']['f_statistic']:.4f}")
-        print(f"   • ANOVA p-value: {results['anova']['p_value']:.4f}")
-        print(f"   • Kruskal-Wallis H-statistic: {results['kruskal_wallis']['h_statistic']:.4f}")
-        print(f"   • Kruskal-Wallis p-value: {results['kruskal_wallis']['p_value']:.4f}")
+        lines = []
+        lines.append(f"📈 Statistical Comparison for {metric}:")
+        lines.append(f"   • Countries: {', '.join(results['countries'])}")
+        lines.append(f"   • ANOVA F-statistic: {results['anova']['f_statistic']:.4f}")
+        lines.append(f"   • ANOVA p-value: {results['anova']['p_value']:.4f}")
+        lines.append(f"   • Kruskal-Wallis H-statistic: {results['kruskal_wallis']['h_statistic']:.4f}")
+        lines.append(f"   • Kruskal-Wallis p-value: {results['kruskal_wallis']['p_value']:.4f}")
         
         if results['anova']['significant']:
-            print("   • ✅ Statistically significant differences found (p < 0.05)")
+            lines.append("   • ✅ Statistically significant differences found (p < 0.05)")
         else:
-            print("   • ❌ No statistically significant differences (p ≥ 0.05)")
+            lines.append("   • ❌ No statistically significant differences (p ≥ 0.05)")
+        print("\n".join(lines))
         
         return results
     
@@ -142,82 +218,127 @@ class SolarAnalyzer:
         Calculate solar potential specific metrics
         
         Args:
-            df (DataFrame): Input data
+            df (DataFrame or ndarray): Input data, or precomputed GHI values
             country_name (str): Country name for reporting
             
         Returns:
             dict: Solar potential metrics
         """
-        if 'GHI' not in df.columns:
+        if not isinstance(df, np.ndarray) and 'GHI' not in df.columns:
             print("❌ GHI data required for solar potential analysis")
             return {}
         
-        ghi_data = df['GHI'].dropna()
+        metrics = self._compute_solar_potential_metrics(df)
+        
+        if metrics and country_name:
+            lines = []
+            lines.append(f"☀️ Solar Potential Metrics for {country_name}:")
+            lines.append(f"   • Average GHI: {metrics['average_ghi']:.2f} W/m²")
+            lines.append(f"   • Peak GHI (95th %): {metrics['peak_95th']:.2f} W/m²")
+            lines.append(f"   • Consistency (CV): {metrics['cv_ghi']:.2f}%")
+            lines.append(f"   • High Potential Hours: {metrics['high_potential_hours']}")
+            print("\n".join(lines))
+        
+        return metrics
+    
+    def _compute_solar_potential_metrics(self, df):
+        """Compute solar potential metrics for a DataFrame with a GHI column"""
+        ghi_data = self._clean(df, 'GHI')
+        n = ghi_data.size
+        if n == 0:
+            print("❌ No valid GHI values for solar potential analysis")
+            return {}
+        
+        average_ghi = ghi_data.sum() / n
+        centered = ghi_data - average_ghi
+        # A single value or a zero mean gives NaN/inf silently, as pandas does
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std_ghi = np.sqrt(np.dot(centered, centered) / (n - 1))
+            cv_ghi = (std_ghi / average_ghi) * 100  # Coefficient of variation
+        
+        peak_95th = _partition_quantile(ghi_data, 0.95)
         
         metrics = {
-            'average_ghi': ghi_data.mean(),
-            'std_ghi': ghi_data.std(),
-            'cv_ghi': (ghi_data.std() / ghi_data.mean()) * 100,  # Coefficient of variation
+            'average_ghi': average_ghi,
+            'std_ghi': std_ghi,
+            'cv_ghi': cv_ghi,
             'peak_ghi': ghi_data.max(),
-            'peak_95th': ghi_data.quantile(0.95),
-            'consistency_score': 100 - (ghi_data.std() / ghi_data.mean()) * 100,
-            'operational_hours': len(ghi_data[ghi_data > 50]),  # Hours with meaningful solar
-            'high_potential_hours': len(ghi_data[ghi_data > 400])  # Hours with high solar
+            'peak_95th': peak_95th,
+            'consistency_score': 100 - cv_ghi,
+            'operational_hours': int(np.count_nonzero(ghi_data > 50)),  # Hours with meaningful solar
+            'high_potential_hours': int(np.count_nonzero(ghi_data > 400))  # Hours with high solar
         }
         
-        if country_name:
-            print(f"☀️ Solar Potential Metrics for {country_name}:")
-            print(f"   • Average GHI: {metrics['average_ghi']:.2f} W/m²")
-            print(f"   • Peak GHI (95th %): {metrics['peak_95th']:.2f} W/m²")
-            print(f"   • Consistency (CV): {metrics['cv_ghi']:.2f}%")
-            print(f"   • High Potential Hours: {metrics['high_potential_hours']}")
-        
         return metrics
     
-    def rank_countries(self, country_data_dict):
+    def _clean(self, df, column):
+        """
+        Get the non-NaN values of a column as a float64 array
+        
+        Nothing is cached on the analyzer; generate_insights_report extracts
+        each frame's values once and passes the arrays on. Arrays are taken
+        to be already cleaned and are returned unchanged.
+        """
+        if isinstance(df, np.ndarray):
+            return df
+        
+        values = df[column].to_numpy(dtype=np.float64)
+        return values[~np.isnan(values)]
+    
+    def rank_countries(self, country_data_dict, country_metrics=None):
         """
         Rank countries based on multiple solar potential factors
         
         Args:
-            country_data_dict (dict): {country_name: dataframe}
+            country_data_dict (dict): {country_name: dataframe or GHI array}
+            country_metrics (dict): Optional precomputed {country_name: metrics}
             
         Returns:
             dict: Country rankings and scores
         """
-        rankings = {}
+        ranked_metrics = {}
         
         for country, df in country_data_dict.items():
-            metrics = self.calculate_solar_potential_metrics(df, country_name=None)
+            if country_metrics is not None and country in country_metrics:
+                metrics = country_metrics[country]
+            else:
+                metrics = self.calculate_solar_potential_metrics(df, country_name=None)
             
             if metrics:
-                # Composite score (weighted)
-                composite_score = (
-                    metrics['average_ghi'] * 0.4 +          # GHI most important
-                    (100 - metrics['cv_ghi']) * 0.3 +       # Consistency important
-                    metrics['high_potential_hours'] * 0.2 + # Operational hours
-                    metrics['peak_95th'] * 0.1              # Peak performance
-                )
-                
-                rankings[country] = {
-                    'composite_score': composite_score,
-                    'average_ghi': metrics['average_ghi'],
-                    'consistency': 100 - metrics['cv_ghi'],
-                    'high_potential_hours': metrics['high_potential_hours'],
-                    'metrics': metrics
-                }
-        
-        # Sort by composite score
-        sorted_rankings = dict(sorted(rankings.items(), 
-                                    key=lambda x: x[1]['composite_score'], 
-                                    reverse=True))
-        
-        print("🏆 Country Rankings by Solar Potential:")
+                ranked_metrics[country] = metrics
+        
+        countries = list(ranked_metrics)
+        average_ghi = np.array([m['average_ghi'] for m in ranked_metrics.values()], dtype=np.float64)
+        cv_ghi = np.array([m['cv_ghi'] for m in ranked_metrics.values()], dtype=np.float64)
+        high_hours = np.array([m['high_potential_hours'] for m in ranked_metrics.values()], dtype=np.float64)
+        peak_95th = np.array([m['peak_95th'] for m in ranked_metrics.values()], dtype=np.float64)
+        
+        # Composite score (weighted), evaluated for all countries at once
+        composite_scores = _composite_score(average_ghi, cv_ghi, high_hours, peak_95th)
+        consistency = 100 - cv_ghi
+        
+        # Sort by composite score (stable, so ties keep input order)
+        sorted_rankings = {}
+        for idx in np.argsort(-composite_scores, kind='stable'):
+            country = countries[idx]
+            metrics = ranked_metrics[country]
+            sorted_rankings[country] = {
+                'composite_score': composite_scores[idx],
+                'average_ghi': metrics['average_ghi'],
+                'consistency': consistency[idx],
+                'high_potential_hours': metrics['high_potential_hours'],
+                'metrics': metrics
+            }
+        
+        lines = []
+        lines.append("🏆 Country Rankings by Solar Potential:")
         for i, (country, scores) in enumerate(sorted_rankings.items(), 1):
-            print(f"   {i}. {country}:")
-            print(f"      • Composite Score: {scores['composite_score']:.2f}")
-            print(f"      • Average GHI: {scores['average_ghi']:.2f} W/m²")
-            print(f"      • Consistency: {scores['consistency']:.2f}%")
-            print(f"      • High Potential Hours: {scores['high_potential_hours']}")
+            lines.append(f"   {i}. {country}:")
+            lines.append(f"      • Composite Score: {scores['composite_score']:.2f}")
+            lines.append(f"      • Average GHI: {scores['average_ghi']:.2f} W/m²")
+            lines.append(f"      • Consistency: {scores['consistency']:.2f}%")
+            lines.append(f"      • High Potential Hours: {scores['high_potential_hours']}")
+        print("\n".join(lines))
         
         return sorted_rankings
     
@@ -231,20 +352,26 @@ class SolarAnalyzer:
         Returns:
             dict: Comprehensive insights
         """
-        print("\n" + "="*60)
-        print("📋 COMPREHENSIVE SOLAR ANALYSIS INSIGHTS")
-        print("="*60)
+        print("\n" + "="*60 + "\n📋 COMPREHENSIVE SOLAR ANALYSIS INSIGHTS\n" + "="*60)
+        
+        # Extract clean GHI values once and share them with every step below;
+        # this dict is the only cache, so it is released with the report
+        ghi_arrays = {
+            country: self._clean(df, 'GHI')
+            for country, df in country_data_dict.items()
+            if 'GHI' in df.columns
+        }
         
         # Calculate metrics for each country
         country_metrics = {}
         for country, df in country_data_dict.items():
-            country_metrics[country] = self.calculate_solar_potential_metrics(df)
+            country_metrics[country] = self.calculate_solar_potential_metrics(ghi_arrays.get(country, df))
         
         # Statistical comparison
-        statistical_results = self.compare_countries_statistical(country_data_dict, 'GHI')
+        statistical_results = self.compare_countries_statistical(ghi_arrays, 'GHI')
         
         # Rankings
-        rankings = self.rank_countries(country_data_dict)
+        rankings = self.rank_countries(ghi_arrays, country_metrics)
         
         # Generate insights
         insights = {
@@ -256,26 +383,28 @@ class SolarAnalyzer:
         }
         
         # Print key insights
+        lines = []
         if insights['top_country']:
-            print(f"\n🎯 PRIMARY RECOMMENDATION: {insights['top_country']}")
+            lines.append(f"\n🎯 PRIMARY RECOMMENDATION: {insights['top_country']}")
             top_metrics = insights['rankings'][insights['top_country']]
-            print(f"   • Best composite solar potential score")
-            print(f"   • Average GHI: {top_metrics['average_ghi']:.2f} W/m²")
-            print(f"   • High consistency: {top_metrics['consistency']:.2f}%")
+            lines.append(f"   • Best composite solar potential score")
+            lines.append(f"   • Average GHI: {top_metrics['average_ghi']:.2f} W/m²")
+            lines.append(f"   • High consistency: {top_metrics['consistency']:.2f}%")
         
         if insights['statistical_significance']:
-            print(f"\n📊 STATISTICAL FINDINGS:")
-            print(f"   • Significant differences confirmed (p < 0.05)")
-            print(f"   • Ranking is statistically supported")
+            lines.append(f"\n📊 STATISTICAL FINDINGS:")
+            lines.append(f"   • Significant differences confirmed (p < 0.05)")
+            lines.append(f"   • Ranking is statistically supported")
         else:
-            print(f"\n📊 STATISTICAL FINDINGS:")
-            print(f"   • Differences not statistically significant")
-            print(f"   • Consider other factors for final decision")
-        
-        print(f"\n💡 STRATEGIC RECOMMENDATIONS:")
-        print(f"   • Focus on {insights['top_country']} for primary investment")
-        print(f"   • Consider secondary options based on local factors")
-        print(f"   • Monitor environmental conditions for optimal performance")
+            lines.append(f"\n📊 STATISTICAL FINDINGS:")
+            lines.append(f"   • Differences not statistically significant")
+            lines.append(f"   • Consider other factors for final decision")
+        
+        lines.append(f"\n💡 STRATEGIC RECOMMENDATIONS:")
+        lines.append(f"   • Focus on {insights['top_country']} for primary investment")
+        lines.append(f"   • Consider secondary options based on local factors")
+        lines.append(f"   • Monitor environmental conditions for optimal performance")
+        print("\n".join(lines))
         
         return insights
 
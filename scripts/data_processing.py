@@ -5,29 +5,62 @@ Modular functions for cleaning and processing solar data
 
 import pandas as pd
 import numpy as np
-from scipy import stats
 import warnings
-warnings.filterwarnings('ignore')
+
+from scripts._kernels import col_stats
+
+# Default columns for imputation and outlier screening
+IMPUTE_COLUMNS = ['GHI', 'DNI', 'DHI', 'Tamb', 'WS', 'RH', 'BP']
+OUTLIER_COLUMNS = ['GHI', 'DNI', 'DHI', 'ModA', 'ModB', 'WS', 'WSgust', 'Tamb']
+
+# Columns read from raw files by default, and hence the schema of cleaned
+# exports; everything else (e.g. the free-text Comments) is skipped by the
+# parser. Pass required_cols=None to SolarDataProcessor to keep every column.
+REQUIRED_COLUMNS = [
+    'Timestamp', 'GHI', 'DNI', 'DHI', 'ModA', 'ModB', 'TModA', 'TModB',
+    'Tamb', 'RH', 'WS', 'WSgust', 'WSstdev', 'WD', 'WDstdev', 'BP',
+    'Cleaning', 'Precipitation'
+]
+
+# Sensor readings carry ~3 significant decimals, so float32 is plenty and
+# halves the memory traffic of every downstream pass
+SOLAR_DTYPES = {
+    'GHI': 'float32', 'DNI': 'float32', 'DHI': 'float32',
+    'ModA': 'float32', 'ModB': 'float32', 'Tamb': 'float32',
+    'WS': 'float32', 'WSgust': 'float32', 'RH': 'float32', 'BP': 'float32'
+}
 
 class SolarDataProcessor:
     """Main class for processing solar data"""
     
-    def __init__(self):
+    def __init__(self, required_cols=REQUIRED_COLUMNS):
+        """
+        Args:
+            required_cols (list): Columns to read from raw files; columns not
+                present in a file are ignored. None reads every column.
+        """
+        self.required_cols = None if required_cols is None else frozenset(required_cols)
         self.cleaning_report = {}
     
-    def load_data(self, filepath, country_name=None):
+    def load_data(self, filepath, country_name=None, engine=None):
         """
         Load solar data from CSV file
         
         Args:
             filepath (str): Path to CSV file
             country_name (str): Optional country name for reporting
+            engine (str): Optional CSV parser engine: 'polars' for the multithreaded
+                Polars reader, or a pandas engine ('c', 'python', 'pyarrow')
             
         Returns:
             pandas.DataFrame: Loaded solar data
         """
         try:
-            df = pd.read_csv(filepath)
+            if engine == 'polars':
+                df = self._read_csv_polars(filepath)
+            else:
+                df = pd.read_csv(filepath, engine=engine, dtype=SOLAR_DTYPES,
+                                 usecols=self._usecols(filepath, engine))
             if country_name:
                 print(f"✅ Loaded {country_name} data: {df.shape}")
             else:
@@ -37,6 +70,38 @@ class SolarDataProcessor:
             print(f"❌ Error loading {filepath}: {e}")
             return None
     
+    def _usecols(self, filepath, engine=None):
+        """Build the pandas usecols argument that projects to required_cols"""
+        if self.required_cols is None:
+            return None
+        if engine != 'pyarrow':
+            # A predicate tolerates required columns missing from the file
+            return self.required_cols.__contains__
+        # The pyarrow engine only takes a list, so match it against the header
+        header = pd.read_csv(filepath, nrows=0).columns
+        if hasattr(filepath, 'seek'):
+            filepath.seek(0)  # Give the header back to the real read
+        return [col for col in header if col in self.required_cols]
+    
+    def _scan_csv_polars(self, filepath):
+        """Lazily scan a CSV with Polars, projected to required_cols"""
+        import polars as pl
+        
+        lf = pl.scan_csv(
+            filepath, try_parse_dates=True, low_memory=False,
+            schema_overrides={col: pl.Float32 for col in SOLAR_DTYPES}
+        )
+        if self.required_cols is not None:
+            lf = lf.select([col for col in lf.collect_schema().names()
+                            if col in self.required_cols])
+        # Literal 'NaN' tokens parse as float NaN, not null; make them missing
+        # values as pandas does, so fill_null and the statistics skip them
+        return lf.with_columns(pl.col(pl.Float32, pl.Float64).fill_nan(None))
+    
+    def _read_csv_polars(self, filepath):
+        """Read a CSV with Polars' multithreaded parser and return a pandas DataFrame"""
+        return self._scan_csv_polars(filepath).collect().to_pandas()
+    
     def handle_missing_values(self, df, columns_to_impute=None):
         """
         Handle missing values in solar dataset
@@ -49,14 +114,24 @@ class SolarDataProcessor:
             DataFrame: Data with missing values handled
         """
         if columns_to_impute is None:
-            columns_to_impute = ['GHI', 'DNI', 'DHI', 'Tamb', 'WS', 'RH', 'BP']
+            columns_to_impute = IMPUTE_COLUMNS
         
         missing_report = {}
         for col in columns_to_impute:
             if col in df.columns:
-                missing_count = df[col].isna().sum()
+                values = df[col].to_numpy()
+                if values.dtype.kind != 'f':
+                    continue  # Only float columns can hold NaN
+                missing = np.isnan(values)
+                missing_count = int(np.count_nonzero(missing))
                 if missing_count > 0:
-                    df[col].fillna(df[col].median(), inplace=True)
+                    # Vectorized fill and a single column assignment; avoids the
+                    # chained fillna(inplace=True), which copy-on-write ignores
+                    with warnings.catch_warnings():
+                        # An all-NaN column has no median and simply stays NaN
+                        warnings.simplefilter('ignore', RuntimeWarning)
+                        median = np.nanmedian(values)
+                    df[col] = np.where(missing, median, values)
                     missing_report[col] = missing_count
                     print(f"✅ Imputed {missing_count} missing values in {col}")
         
@@ -76,20 +151,20 @@ class SolarDataProcessor:
             dict: Outlier report
         """
         if columns is None:
-            columns = ['GHI', 'DNI', 'DHI', 'ModA', 'ModB', 'WS', 'WSgust', 'Tamb']
+            columns = OUTLIER_COLUMNS
         
-        outliers_report = {}
-        for col in columns:
-            if col in df.columns and df[col].dtype in ['float64', 'int64']:
-                z_scores = np.abs(stats.zscore(df[col].dropna()))
-                outlier_count = np.sum(z_scores > z_threshold)
-                outliers_report[col] = outlier_count
-                if outlier_count > 0:
-                    print(f"📊 {col}: {outlier_count} outliers ({outlier_count/len(df)*100:.2f}%)")
+        _, outliers_report = self._compute_zmask(df, columns, z_threshold)
+        self._print_outliers(outliers_report, len(df))
         
         return outliers_report
     
-    def remove_outliers(self, df, columns=None, z_threshold=3):
+    def _print_outliers(self, outliers_report, n_rows):
+        """Print the per-column outlier counts of a detection pass"""
+        for col, outlier_count in outliers_report.items():
+            if outlier_count > 0:
+                print(f"📊 {col}: {outlier_count} outliers ({outlier_count/n_rows*100:.2f}%)")
+    
+    def remove_outliers(self, df, columns=None, z_threshold=3, outlier_mask=None):
         """
         Remove outliers using Z-score method
         
@@ -97,6 +172,8 @@ class SolarDataProcessor:
             df (DataFrame): Input data
             columns (list): Columns to check for outliers
             z_threshold (float): Z-score threshold
+            outlier_mask (ndarray): Optional row mask already computed for
+                this exact data by _compute_zmask; computed when None
             
         Returns:
             DataFrame: Data with outliers removed
@@ -104,14 +181,14 @@ class SolarDataProcessor:
         initial_shape = df.shape
         
         if columns is None:
-            columns = ['GHI', 'DNI', 'DHI', 'ModA', 'ModB', 'WS', 'WSgust', 'Tamb']
+            columns = OUTLIER_COLUMNS
         
-        for col in columns:
-            if col in df.columns:
-                z_scores = np.abs(stats.zscore(df[col].dropna()))
-                outlier_mask = z_scores > z_threshold
-                if outlier_mask.any():
-                    df = df[~outlier_mask]
+        if outlier_mask is None:
+            outlier_mask, _ = self._compute_zmask(df, columns, z_threshold)
+        if outlier_mask.any():
+            # take() returns an independent frame, so later column assignments
+            # do not trip SettingWithCopyWarning
+            df = df.take(np.flatnonzero(~outlier_mask))
         
         removed_count = initial_shape[0] - df.shape[0]
         print(f"✅ Removed {removed_count} outlier rows")
@@ -119,6 +196,43 @@ class SolarDataProcessor:
         
         return df
     
+    def _compute_zmask(self, df, columns, z_threshold):
+        """
+        Compute Z-score outlier flags for several columns in one vectorized pass
+        
+        Args:
+            df (DataFrame): Input data
+            columns (list): Columns to check for outliers
+            z_threshold (float): Z-score threshold
+            
+        Returns:
+            tuple: (row mask of rows that are outliers in any column,
+                    {column: outlier count})
+        """
+        columns = [col for col in columns
+                   if col in df.columns and pd.api.types.is_numeric_dtype(df[col])]
+        
+        if not columns:
+            mask = np.zeros(len(df), dtype=bool)
+            counts = {}
+        else:
+            # Own the buffer: it is overwritten with Z-scores below
+            arr = df[columns].to_numpy(dtype=np.float32, copy=True)
+            # Population statistics over non-NaN values, as scipy.stats.zscore
+            _, mu, sd = col_stats(arr)
+            mu = mu.astype(np.float32)
+            sd = sd.astype(np.float32)
+            # Standardise in place, with no further float temporaries
+            with np.errstate(divide='ignore', invalid='ignore'):
+                arr -= mu
+                arr /= sd
+                np.abs(arr, out=arr)
+            col_mask = arr > z_threshold
+            mask = col_mask.any(axis=1)
+            counts = dict(zip(columns, np.count_nonzero(col_mask, axis=0).tolist()))
+        
+        return mask, counts
+    
     def process_timestamp(self, df, timestamp_col='Timestamp'):
         """
         Process timestamp and extract temporal features
@@ -132,19 +246,150 @@ class SolarDataProcessor:
         """
         if timestamp_col in df.columns:
             df[timestamp_col] = pd.to_datetime(df[timestamp_col])
-            df['Hour'] = df[timestamp_col].dt.hour
-            df['Month'] = df[timestamp_col].dt.month
-            df['DayOfWeek'] = df[timestamp_col].dt.dayofweek
-            df['Season'] = (df[timestamp_col].dt.month % 12 + 3) // 3
+            timestamps = pd.DatetimeIndex(df[timestamp_col])
+            
+            if timestamps.hasnans:
+                # NaT rows need NaN features, so keep pandas' float accessors
+                hour = timestamps.hour.to_numpy()
+                month = timestamps.month.to_numpy()
+                day_of_week = timestamps.dayofweek.to_numpy()
+            else:
+                # Derive hour and weekday from whole hours since the epoch
+                # (wall-clock time for tz-aware data); 1970-01-01 was a Thursday
+                wall_clock = timestamps.tz_localize(None) if timestamps.tz is not None else timestamps
+                hours = wall_clock.to_numpy().astype('datetime64[h]').astype(np.int64)
+                hour = (hours % 24).astype(np.int8)
+                day_of_week = ((hours // 24 + 3) % 7).astype(np.int8)
+                month = timestamps.month.to_numpy().astype(np.int8)
+            
+            df['Hour'] = hour
+            df['Month'] = month
+            df['DayOfWeek'] = day_of_week
+            df['Season'] = (month % 12 + 3) // 3
             print("✅ Processed timestamp and extracted temporal features")
         
         return df
     
+    def _clean_with_polars(self, filepath, z_threshold=3, timestamp_col='Timestamp'):
+        """
+        Run the whole cleaning pipeline as one Polars lazy query
+        
+        Imputation, z-score filtering and temporal feature extraction are
+        fused into a single plan, so no intermediate DataFrames are built.
+        
+        Args:
+            filepath (str): Path to raw data CSV
+            z_threshold (float): Z-score threshold
+            timestamp_col (str): Timestamp column name
+            
+        Returns:
+            tuple: (cleaned pandas DataFrame, initial record count), or None on error
+        """
+        import polars as pl
+        
+        try:
+            lf = self._scan_csv_polars(filepath)
+            schema = lf.collect_schema()
+        except Exception as e:
+            print(f"❌ Error loading {filepath}: {e}")
+            return None
+        
+        impute_cols = [col for col in IMPUTE_COLUMNS if col in schema]
+        outlier_cols = [col for col in OUTLIER_COLUMNS
+                        if col in schema and schema[col].is_numeric()]
+        
+        filled = lf.with_columns([pl.col(col).fill_null(pl.col(col).median()) for col in impute_cols])
+        
+        # Population z-score (ddof=0), as scipy.stats.zscore. Polars sorts NaN
+        # above every number, so a zero-variance column must not be divided
+        # out: it never flags a row, as in the pandas path
+        outlier_flags = [
+            pl.when(pl.col(col).std(ddof=0) > 0)
+            .then(((pl.col(col) - pl.col(col).mean()) / pl.col(col).std(ddof=0)).abs() > z_threshold)
+            .otherwise(False)
+            .fill_null(False)
+            for col in outlier_cols
+        ]
+        
+        cleaned = filled
+        if outlier_flags:
+            cleaned = cleaned.filter(~pl.any_horizontal(outlier_flags))
+        
+        if timestamp_col in schema:
+            timestamp = pl.col(timestamp_col)
+            if schema[timestamp_col] == pl.String:
+                timestamp = timestamp.str.to_datetime()
+            cleaned = cleaned.with_columns(timestamp.alias(timestamp_col)).with_columns(
+                pl.col(timestamp_col).dt.hour().alias('Hour'),
+                pl.col(timestamp_col).dt.month().alias('Month'),
+                (pl.col(timestamp_col).dt.weekday() - 1).alias('DayOfWeek'),  # Monday=0, as pandas
+                (pl.col(timestamp_col).dt.month() % 12 + 3).floordiv(3).alias('Season')
+            )
+        
+        # Report counts share the scan with the main query
+        report = lf.select(
+            [pl.len().alias('_rows')]
+            + [pl.col(col).null_count().alias(col) for col in impute_cols]
+        )
+        outlier_counts = filled.select(
+            [flag.sum().alias(col) for col, flag in zip(outlier_cols, outlier_flags)]
+            or [pl.len().alias('_rows')]
+        )
+        
+        try:
+            report, outlier_counts, cleaned = pl.collect_all([report, outlier_counts, cleaned])
+        except Exception as e:
+            print(f"❌ Error cleaning {filepath}: {e}")
+            return None
+        
+        report = report.row(0, named=True)
+        initial_rows = report.pop('_rows')
+        missing_report = {col: count for col, count in report.items() if count > 0}
+        for col, count in missing_report.items():
+            print(f"✅ Imputed {count} missing values in {col}")
+        
+        outliers_report = {col: outlier_counts[col][0] for col in outlier_cols}
+        for col, count in outliers_report.items():
+            if count > 0:
+                print(f"📊 {col}: {count} outliers ({count/initial_rows*100:.2f}%)")
+        
+        removed_count = initial_rows - cleaned.height
+        print(f"✅ Removed {removed_count} outlier rows")
+        
+        self.cleaning_report['missing_values'] = missing_report
+        self.cleaning_report['outliers_detected'] = outliers_report
+        self.cleaning_report['outliers_removed'] = removed_count
+        
+        return cleaned.to_pandas(), initial_rows
+    
+    def export_data(self, df, export_path):
+        """
+        Save cleaned data, choosing the format from the file suffix
+        
+        '.parquet' writes snappy-compressed Parquet (requires pyarrow), '.h5'
+        or '.hdf5' writes a queryable HDF5 table (requires PyTables); any
+        other suffix falls back to CSV.
+        
+        Args:
+            df (DataFrame): Cleaned solar data
+            export_path (str): Output file path
+        """
+        import os
+        
+        suffix = os.path.splitext(export_path)[1].lower()
+        if suffix == '.parquet':
+            df.to_parquet(export_path, engine='pyarrow', compression='snappy', index=False)
+        elif suffix in ('.h5', '.hdf5'):
+            df.to_hdf(export_path, key='data', mode='w', format='table', complib='blosc')
+        else:
+            df.to_csv(export_path, index=False)
+        print(f"💾 Cleaned data exported to: {export_path}")
+    
     def get_cleaning_summary(self):
         """Get summary of cleaning operations"""
         return self.cleaning_report
     
-    def clean_solar_data(self, filepath, export_path=None, country_name=None):
+    def clean_solar_data(self, filepath, export_path=None, country_name=None, engine=None):
         """
         Complete data cleaning pipeline for solar data
         
@@ -152,6 +397,8 @@ class SolarDataProcessor:
             filepath (str): Path to raw data CSV
             export_path (str): Path to save cleaned data
             country_name (str): Country name for reporting
+            engine (str): Optional CSV parser engine; 'polars' runs the whole
+                pipeline as a single Polars lazy query
             
         Returns:
             DataFrame: Cleaned solar data
@@ -160,57 +407,66 @@ class SolarDataProcessor:
         print(f"�� Processing {country_name if country_name else 'solar'} data...")
         print(f"{'='*50}")
         
-        # Load data
-        df = self.load_data(filepath, country_name)
-        if df is None:
-            return None
-        
-        initial_shape = df.shape
-        
-        # Handle missing values
-        df = self.handle_missing_values(df)
-        
-        # Detect outliers
-        outliers_report = self.detect_outliers(df)
-        self.cleaning_report['outliers_detected'] = outliers_report
-        
-        # Remove outliers
-        df = self.remove_outliers(df)
-        
-        # Process timestamp
-        df = self.process_timestamp(df)
+        if engine == 'polars':
+            result = self._clean_with_polars(filepath)
+            if result is None:
+                return None
+            df, initial_rows = result
+        else:
+            # Load data
+            df = self.load_data(filepath, country_name, engine=engine)
+            if df is None:
+                return None
+            
+            initial_rows = df.shape[0]
+            
+            # Handle missing values
+            df = self.handle_missing_values(df)
+            
+            # Detect outliers; one Z-score pass serves detection and removal
+            outlier_mask, outliers_report = self._compute_zmask(df, OUTLIER_COLUMNS, 3)
+            self._print_outliers(outliers_report, len(df))
+            self.cleaning_report['outliers_detected'] = outliers_report
+            
+            # Remove outliers
+            df = self.remove_outliers(df, outlier_mask=outlier_mask)
+            
+            # Process timestamp
+            df = self.process_timestamp(df)
         
         # Export if path provided
         if export_path:
-            df.to_csv(export_path, index=False)
-            print(f"💾 Cleaned data exported to: {export_path}")
+            self.export_data(df, export_path)
         
         # Final report
         print(f"\n📊 CLEANING SUMMARY for {country_name}:")
-        print(f"   • Initial records: {initial_shape[0]}")
+        print(f"   • Initial records: {initial_rows}")
         print(f"   • Final records: {df.shape[0]}")
-        print(f"   • Records removed: {initial_shape[0] - df.shape[0]}")
+        print(f"   • Records removed: {initial_rows - df.shape[0]}")
         print(f"   • Columns processed: {df.shape[1]}")
         
         return df
 
 # Convenience functions
-def load_and_clean_data(filepath, export_path=None, country_name=None):
+def load_and_clean_data(filepath, export_path=None, country_name=None, engine=None):
     """
     Convenience function for one-line data loading and cleaning
     """
     processor = SolarDataProcessor()
-    return processor.clean_solar_data(filepath, export_path, country_name)
+    return processor.clean_solar_data(filepath, export_path, country_name, engine=engine)
 
-def batch_process_countries(data_dir, output_dir):
+def batch_process_countries(data_dir, output_dir, engine=None):
     """
     Process all country data files in a directory
     
     Args:
         data_dir (str): Directory containing raw data files
         output_dir (str): Directory for cleaned outputs
+        engine (str): Optional CSV parser engine (e.g. 'polars')
     """
     import os
+    import importlib.util
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
     
     country_files = {
         'Benin': 'benin-malanville.csv',
@@ -218,18 +474,46 @@ def batch_process_countries(data_dir, output_dir):
         'Togo': 'togo.csv'
     }
     
-    results = {}
+    # Parquet is much faster to write and read back; pyarrow is optional
+    suffix = '.parquet' if importlib.util.find_spec('pyarrow') else '.csv'
+    
+    jobs = []
     for country, filename in country_files.items():
         input_path = os.path.join(data_dir, filename)
-        output_path = os.path.join(output_dir, f"{country.lower()}_clean.csv")
+        output_path = os.path.join(output_dir, f"{country.lower()}_clean{suffix}")
         
         if os.path.exists(input_path):
-            print(f"\n🎯 Processing {country}...")
-            df = load_and_clean_data(input_path, output_path, country)
-            results[country] = df
+            jobs.append((input_path, output_path, country))
         else:
             print(f"❌ File not found: {input_path}")
     
+    if not jobs:
+        return {}
+    
+    # Polars releases the GIL and already uses every core per file, so threads
+    # suffice there; the pandas pipeline needs separate processes
+    executor_cls = ThreadPoolExecutor if engine == 'polars' else ProcessPoolExecutor
+    
+    cleaned = {}
+    with executor_cls(max_workers=len(jobs)) as executor:
+        futures = {}
+        for input_path, output_path, country in jobs:
+            print(f"\n🎯 Processing {country}...")
+            future = executor.submit(load_and_clean_data, input_path, output_path, country, engine)
+            futures[future] = country
+        for future in as_completed(futures):
+            country = futures[future]
+            try:
+                cleaned[country] = future.result()
+            except Exception as e:
+                print(f"❌ Failed to process {country}: {e}")
+    
+    # Keep the input order regardless of completion order
+    results = {}
+    for _, _, country in jobs:
+        if country in cleaned:
+            results[country] = cleaned[country]
+    
     return results
 
 if __name__ == "__main__":
@@ -11,6 +11,16 @@ import numpy as np
 class SolarVisualizer:
     """Class for creating solar data visualizations"""
     
+    _UNITS = {
+        'GHI': 'GHI (W/m²)',
+        'DNI': 'DNI (W/m²)',
+        'DHI': 'DHI (W/m²)',
+        'Tamb': 'Temperature (°C)',
+        'RH': 'Relative Humidity (%)',
+        'WS': 'Wind Speed (m/s)',
+        'BP': 'Pressure (hPa)'
+    }
+    
     def __init__(self, style='seaborn-v0_8'):
         self.style = style
         self.setup_style()
@@ -36,12 +46,17 @@ class SolarVisualizer:
         if metrics is None:
             metrics = ['GHI', 'Tamb', 'DNI', 'WS']
         
-        self.setup_style()
         fig, axes = plt.subplots(2, 2, figsize=figsize)
         axes = axes.flatten()
         
         colors = ['blue', 'red', 'green', 'purple']
         
+        # A panel is at most ~100 px per inch wide, so anything beyond a few
+        # points per pixel is invisible and only slows rendering down
+        max_points = 4 * int(figsize[0] * 100)
+        if len(df) > max_points:
+            df = df.iloc[::len(df) // max_points]
+        
         for i, metric in enumerate(metrics):
             if i < len(axes) and metric in df.columns:
                 axes[i].plot(df['Timestamp'], df[metric], 
@@ -72,10 +87,9 @@ class SolarVisualizer:
         
         available_columns = [col for col in columns if col in df.columns]
         
-        self.setup_style()
         fig, ax = plt.subplots(figsize=figsize)
         
-        correlation_matrix = df[available_columns].corr()
+        correlation_matrix = self._correlation_matrix(df, available_columns)
         
         mask = np.triu(np.ones_like(correlation_matrix, dtype=bool))
         sns.heatmap(correlation_matrix, mask=mask, annot=True, cmap='RdBu_r', 
@@ -84,6 +98,44 @@ class SolarVisualizer:
         ax.set_title('Correlation Heatmap - Solar Parameters', fontsize=14, pad=20)
         return fig
     
+    def _correlation_matrix(self, df, columns):
+        """
+        Pearson correlation matrix, equivalent to df[columns].corr()
+        
+        All-NaN columns are set aside and come back as NaN. When the rest of
+        the block has no NaNs, the matrix is one float32 matrix product;
+        otherwise NaNs are excluded pairwise, as in pandas.
+        """
+        values = df[columns].to_numpy(dtype=np.float32)
+        nan_mask = np.isnan(values)
+        present = ~nan_mask.all(axis=0)
+        block = values[:, present]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if block.shape[0] > 1 and not nan_mask[:, present].any():
+                block -= block.mean(axis=0)
+                block /= block.std(axis=0)
+                block_corr = (block.T @ block) / block.shape[0]
+            else:
+                block = block.astype(np.float64)
+                block_valid = ~np.isnan(block)
+                n_cols = block.shape[1]
+                block_corr = np.full((n_cols, n_cols), np.nan)
+                for i in range(n_cols):
+                    for j in range(i, n_cols):
+                        valid = block_valid[:, i] & block_valid[:, j]
+                        if valid.sum() < 2:
+                            continue
+                        x = block[valid, i] - block[valid, i].mean()
+                        y = block[valid, j] - block[valid, j].mean()
+                        block_corr[i, j] = block_corr[j, i] = (
+                            np.dot(x, y) / (np.linalg.norm(x) * np.linalg.norm(y))
+                        )
+        
+        corr = np.full((len(columns), len(columns)), np.nan)
+        corr[np.ix_(present, present)] = block_corr
+        return pd.DataFrame(corr, index=columns, columns=columns)
+    
     def create_distribution_plots(self, df, metrics=None, figsize=(15, 10)):
         """
         Create distribution plots for solar metrics
@@ -99,7 +151,6 @@ class SolarVisualizer:
         if metrics is None:
             metrics = ['GHI', 'Tamb', 'RH', 'WS']
         
-        self.setup_style()
         fig, axes = plt.subplots(2, 2, figsize=figsize)
         axes = axes.flatten()
         
@@ -107,8 +158,11 @@ class SolarVisualizer:
         
         for i, metric in enumerate(metrics):
             if i < len(axes) and metric in df.columns:
-                axes[i].hist(df[metric].dropna(), bins=50, alpha=0.7, 
-                           color=colors[i], edgecolor='black')
+                # Bin once in NumPy and draw the bars directly
+                values = df[metric].to_numpy(copy=False)
+                counts, edges = np.histogram(values[np.isfinite(values)], bins=50)
+                axes[i].bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+                           alpha=0.7, color=colors[i], edgecolor='black')
                 axes[i].set_title(f'{metric} Distribution')
                 axes[i].set_xlabel(self._get_metric_unit(metric))
                 axes[i].set_ylabel('Frequency')
@@ -130,17 +184,31 @@ class SolarVisualizer:
         Returns:
             matplotlib.figure.Figure: The created figure
         """
-        self.setup_style()
         fig, ax = plt.subplots(figsize=figsize)
         
-        plot_data = []
-        labels = []
+        # Box statistics straight from the raw arrays, so matplotlib never
+        # copies or fully sorts the data
+        box_stats = []
         for country, df in data_dict.items():
             if metric in df.columns:
-                plot_data.append(df[metric].dropna())
-                labels.append(country)
+                values = df[metric].to_numpy(dtype=np.float64)
+                if np.isnan(values).all():
+                    continue
+                q1, med, q3 = np.nanpercentile(values, [25, 50, 75])
+                iqr = q3 - q1
+                # Whiskers reach the most extreme data within 1.5 IQR, as in ax.boxplot
+                box_stats.append({
+                    'label': country,
+                    'q1': q1,
+                    'med': med,
+                    'q3': q3,
+                    'whislo': np.min(values, where=values >= q1 - 1.5 * iqr, initial=np.inf),
+                    'whishi': np.max(values, where=values <= q3 + 1.5 * iqr, initial=-np.inf)
+                })
         
-        ax.boxplot(plot_data, labels=labels)
+        # bxp() cannot draw an empty list; leave the axes blank instead
+        if box_stats:
+            ax.bxp(box_stats, showfliers=False)
         ax.set_title(f'{metric} Comparison Across Countries', fontsize=14)
         ax.set_ylabel(self._get_metric_unit(metric))
         ax.grid(True, alpha=0.3)
@@ -150,16 +218,7 @@ class SolarVisualizer:
     
     def _get_metric_unit(self, metric):
         """Get proper unit label for metrics"""
-        units = {
-            'GHI': 'GHI (W/m²)',
-            'DNI': 'DNI (W/m²)',
-            'DHI': 'DHI (W/m²)',
-            'Tamb': 'Temperature (°C)',
-            'RH': 'Relative Humidity (%)',
-            'WS': 'Wind Speed (m/s)',
-            'BP': 'Pressure (hPa)'
-        }
-        return units.get(metric, metric)
+        return self._UNITS.get(metric, metric)
     
     def save_plot(self, fig, filename, dpi=300):
         """
@@ -174,7 +233,7 @@ class SolarVisualizer:
         print(f"💾 Plot saved: {filename}")
 
 # Convenience functions
-def create_analysis_report(df, country_name, output_dir='reports'):
+def create_analysis_report(df, country_name, output_dir='reports', dpi=150):
     """
     Create comprehensive analysis report for a country
     
@@ -182,23 +241,27 @@ def create_analysis_report(df, country_name, output_dir='reports'):
         df (DataFrame): Cleaned solar data
         country_name (str): Country name
         output_dir (str): Output directory for plots
+        dpi (int): Resolution for saved plots; use 300 for publication output
     """
     import os
     os.makedirs(output_dir, exist_ok=True)
     
     visualizer = SolarVisualizer()
     
-    # Create various plots
+    # Create various plots, closing each one as soon as it is saved so only
+    # one figure buffer is alive at a time
     time_series_fig = visualizer.create_time_series_plot(df, title_suffix=f"- {country_name}")
-    visualizer.save_plot(time_series_fig, f"{output_dir}/{country_name}_time_series.png")
+    visualizer.save_plot(time_series_fig, f"{output_dir}/{country_name}_time_series.png", dpi=dpi)
+    plt.close(time_series_fig)
     
     correlation_fig = visualizer.create_correlation_heatmap(df)
-    visualizer.save_plot(correlation_fig, f"{output_dir}/{country_name}_correlation.png")
+    visualizer.save_plot(correlation_fig, f"{output_dir}/{country_name}_correlation.png", dpi=dpi)
+    plt.close(correlation_fig)
     
     distribution_fig = visualizer.create_distribution_plots(df)
-    visualizer.save_plot(distribution_fig, f"{output_dir}/{country_name}_distributions.png")
+    visualizer.save_plot(distribution_fig, f"{output_dir}/{country_name}_distributions.png", dpi=dpi)
+    plt.close(distribution_fig)
     
-    plt.close('all')
     print(f"✅ Analysis report created for {country_name}")
 
 if __name__ == "__main__":
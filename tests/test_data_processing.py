@@ -2,7 +2,9 @@
 Unit tests for data processing functions
 """
 
+import io
 import unittest
+from unittest import mock
 import pandas as pd
 import numpy as np
 import os
@@ -11,30 +13,62 @@ import sys
 # Add the parent directory to the path so we can import our scripts
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from scripts import _kernels
 from scripts.data_processing import SolarDataProcessor, load_and_clean_data
 
+try:
+    import polars
+except ImportError:
+    polars = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 class TestDataProcessing(unittest.TestCase):
     """Test cases for data processing functions"""
     
-    def setUp(self):
-        """Set up test data"""
-        self.processor = SolarDataProcessor()
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data once for all tests"""
+        rng = np.random.default_rng(42)
+        
+        # Add some missing values on the raw array, before pandas owns it
+        ghi = rng.normal(400, 100, 100)
+        ghi[10:16] = np.nan
         
         # Create sample test data
-        self.sample_data = pd.DataFrame({
-            'Timestamp': pd.date_range('2023-01-01', periods=100, freq='H'),
-            'GHI': np.random.normal(400, 100, 100),
-            'DNI': np.random.normal(500, 150, 100),
-            'DHI': np.random.normal(100, 50, 100),
-            'Tamb': np.random.normal(25, 5, 100),
-            'RH': np.random.normal(60, 20, 100),
-            'WS': np.random.normal(3, 1, 100)
+        cls.sample_data = pd.DataFrame({
+            'Timestamp': pd.date_range('2023-01-01', periods=100, freq='h'),
+            'GHI': ghi,
+            'DNI': rng.normal(500, 150, 100),
+            'DHI': rng.normal(100, 50, 100),
+            'Tamb': rng.normal(25, 5, 100),
+            'RH': rng.normal(60, 20, 100),
+            'WS': rng.normal(3, 1, 100)
         })
         
-        # Add some missing values and outliers for testing
-        self.sample_data.loc[10:15, 'GHI'] = np.nan
-        self.sample_data.loc[90, 'DNI'] = 1000  # Outlier
+        # Add an outlier for testing
+        cls.sample_data.loc[90, 'DNI'] = 1000  # Outlier
+        
+        # Serialised once so the pipeline tests can load it without disk I/O
+        cls.sample_csv_bytes = cls.sample_data.to_csv(index=False).encode()
+    
+    def setUp(self):
+        """Create a fresh processor, since the cleaning report is stateful"""
+        self.processor = SolarDataProcessor()
+    
+    def _load_from_memory(self):
+        """Patch SolarDataProcessor.load_data to read the sample CSV from memory"""
+        load_data = SolarDataProcessor.load_data
+        csv_bytes = self.sample_csv_bytes
+        
+        def load_from_memory(processor, filepath, country_name=None, engine=None):
+            return load_data(processor, io.BytesIO(csv_bytes), country_name, engine=engine)
         
+        return mock.patch.object(SolarDataProcessor, 'load_data', load_from_memory)
+    
     def test_processor_initialization(self):
         """Test that processor initializes correctly"""
         self.assertIsInstance(self.processor, SolarDataProcessor)
@@ -68,9 +102,49 @@ class TestDataProcessing(unittest.TestCase):
         self.assertLess(df_cleaned.shape[0], initial_shape[0])
         self.assertIn('outliers_removed', self.processor.cleaning_report)
     
+    def test_remove_outliers_with_missing_values(self):
+        """Test that outlier rows are dropped correctly when a column has NaNs"""
+        df = self.sample_data.copy()
+        df['DNI'] = 500.0
+        df.loc[90, 'DNI'] = 10000  # Only outlier
+        df['DHI'] = 100.0
+        df.loc[0:4, 'DHI'] = np.nan  # Not imputed before outlier removal
+        df = df[['Timestamp', 'DNI', 'DHI']]
+        
+        df_cleaned = self.processor.remove_outliers(df)
+        
+        self.assertEqual(df_cleaned.shape[0], df.shape[0] - 1)
+        self.assertNotIn(90, df_cleaned.index)
+    
+    def test_load_data_reads_required_columns_only(self):
+        """Test that load_data skips columns outside required_cols"""
+        csv_bytes = self.sample_data.assign(Comments='none').to_csv(index=False).encode()
+        
+        engines = [None, 'pyarrow'] if pyarrow else [None]
+        for engine in engines:
+            with self.subTest(engine=engine):
+                df = self.processor.load_data(io.BytesIO(csv_bytes), engine=engine)
+                
+                self.assertIsNotNone(df)
+                self.assertNotIn('Comments', df.columns)
+                self.assertIn('GHI', df.columns)
+                self.assertEqual(df['GHI'].dtype, np.float32)
+    
+    def test_remove_outliers_after_column_update(self):
+        """Test that removal uses current values, not an earlier detection pass"""
+        df = self.sample_data.copy()
+        self.processor.detect_outliers(df)
+        df['GHI'] = 400.0
+        df.loc[50, 'GHI'] = 10000  # New outlier, added after detection
+        
+        df_cleaned = self.processor.remove_outliers(df)
+        
+        self.assertNotIn(50, df_cleaned.index)
+        self.assertEqual(df_cleaned.shape[0], SolarDataProcessor().remove_outliers(df).shape[0])
+    
     def test_process_timestamp(self):
         """Test timestamp processing"""
-        df_processed = self.processor.process_timestamp(self.sample_data)
+        df_processed = self.processor.process_timestamp(self.sample_data.copy())
         
         # Check that new columns are created
         self.assertIn('Hour', df_processed.columns)
@@ -83,43 +157,129 @@ class TestDataProcessing(unittest.TestCase):
     
     def test_complete_cleaning_pipeline(self):
         """Test the complete cleaning pipeline"""
-        # Create a test file
-        test_file = 'test_sample_data.csv'
-        self.sample_data.to_csv(test_file, index=False)
-        
-        try:
+        with self._load_from_memory():
             # Test the complete pipeline
             df_cleaned = self.processor.clean_solar_data(
-                test_file, 
+                'test_sample_data.csv', 
                 country_name='TestCountry'
             )
-            
-            # Check that data is returned
-            self.assertIsNotNone(df_cleaned)
-            self.assertIsInstance(df_cleaned, pd.DataFrame)
-            
-            # Check that cleaning report is populated
-            self.assertIn('missing_values', self.processor.cleaning_report)
-            self.assertIn('outliers_detected', self.processor.cleaning_report)
-            self.assertIn('outliers_removed', self.processor.cleaning_report)
-            
-        finally:
-            # Clean up
-            if os.path.exists(test_file):
-                os.remove(test_file)
+        
+        # Check that data is returned
+        self.assertIsNotNone(df_cleaned)
+        self.assertIsInstance(df_cleaned, pd.DataFrame)
+        
+        # Check that cleaning report is populated
+        self.assertIn('missing_values', self.processor.cleaning_report)
+        self.assertIn('outliers_detected', self.processor.cleaning_report)
+        self.assertIn('outliers_removed', self.processor.cleaning_report)
     
     def test_load_and_clean_convenience_function(self):
         """Test the convenience function"""
-        test_file = 'test_convenience.csv'
-        self.sample_data.to_csv(test_file, index=False)
-        
-        try:
-            df_cleaned = load_and_clean_data(test_file, country_name='TestConvenience')
-            self.assertIsNotNone(df_cleaned)
-            self.assertIsInstance(df_cleaned, pd.DataFrame)
-        finally:
-            if os.path.exists(test_file):
-                os.remove(test_file)
+        with self._load_from_memory():
+            df_cleaned = load_and_clean_data('test_convenience.csv', country_name='TestConvenience')
+        
+        self.assertIsNotNone(df_cleaned)
+        self.assertIsInstance(df_cleaned, pd.DataFrame)
+    
+    @unittest.skipUnless(polars, "polars is not installed")
+    def test_polars_pipeline_matches_pandas(self):
+        """Test that engine='polars' cleans like pandas with constant columns and NaN tokens"""
+        df = self.sample_data.assign(WSgust=2.0)  # Zero variance
+        csv_bytes = df.to_csv(index=False, na_rep='NaN').encode()
+        
+        pandas_processor = SolarDataProcessor()
+        polars_processor = SolarDataProcessor()
+        df_pandas = pandas_processor.clean_solar_data(io.BytesIO(csv_bytes))
+        df_polars = polars_processor.clean_solar_data(io.BytesIO(csv_bytes), engine='polars')
+        
+        self.assertEqual(df_polars.shape, df_pandas.shape)
+        self.assertEqual(polars_processor.cleaning_report, pandas_processor.cleaning_report)
+        np.testing.assert_allclose(df_polars['GHI'].to_numpy(), df_pandas['GHI'].to_numpy(), rtol=1e-6)
+
+class TestKernels(unittest.TestCase):
+    """Test the column statistics kernels"""
+    
+    @unittest.skipIf(_kernels.njit is None, "numba is not installed")
+    def test_col_stats_numba_matches_numpy(self):
+        """Test that the Numba and NumPy col_stats paths agree"""
+        rng = np.random.default_rng(0)
+        arr = np.empty((200, 4), dtype=np.float32)
+        arr[:, 0] = rng.normal(400, 100, 200)
+        arr[rng.random(200) < 0.1, 0] = np.nan  # Scattered NaNs
+        arr[:, 1] = np.nan  # All NaN
+        arr[:, 2] = 2.5  # Constant
+        arr[:, 3] = rng.normal(25, 5, 200)
+        
+        count_nb, mean_nb, std_nb = _kernels._col_stats_numba(np.asfortranarray(arr))
+        count_np, mean_np, std_np = _kernels._col_stats_numpy(arr)
+        
+        # Both accumulate in float64; results feed float32 Z-scores, so
+        # agreement well inside float32 precision is what matters
+        np.testing.assert_array_equal(count_nb, count_np)
+        np.testing.assert_allclose(mean_nb, mean_np, rtol=1e-7, equal_nan=True)
+        np.testing.assert_allclose(std_nb, std_np, rtol=1e-7, atol=1e-12, equal_nan=True)
+        self.assertEqual(std_nb[2], 0.0)
+        self.assertTrue(np.isnan(mean_nb[1]) and np.isnan(std_nb[1]))
+
+class TestPandasEquivalents(unittest.TestCase):
+    """Test hand-written NumPy helpers against the pandas methods they replace"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up data with scattered NaNs, a sparse column and a constant column"""
+        rng = np.random.default_rng(7)
+        ghi = rng.normal(400, 100, 300)
+        ghi[rng.random(300) < 0.1] = np.nan
+        sparse = rng.normal(30, 5, 300)
+        sparse[rng.random(300) < 0.95] = np.nan
+        cls.data = pd.DataFrame({
+            'GHI': ghi,
+            'DNI': 1.2 * np.nan_to_num(ghi) + rng.normal(0, 50, 300),
+            'Tamb': rng.normal(25, 5, 300),
+            'TModA': sparse,
+            'TModB': np.nan,  # All NaN
+            'BP': 1000.0  # Constant
+        })
+    
+    def test_correlation_matrix_matches_pandas(self):
+        """Test SolarVisualizer._correlation_matrix against DataFrame.corr()"""
+        import matplotlib
+        matplotlib.use('Agg')
+        from scripts.visualization import SolarVisualizer
+        
+        visualizer = SolarVisualizer()
+        # Pairwise path (NaNs present), then the matrix-product path (complete)
+        for df in (self.data, self.data.dropna(subset=['GHI'])[['GHI', 'DNI', 'Tamb', 'BP']]):
+            with self.subTest(columns=list(df.columns)):
+                columns = list(df.columns)
+                expected = df.corr()
+                actual = visualizer._correlation_matrix(df, columns)
+                np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(),
+                                           rtol=1e-5, atol=1e-6, equal_nan=True)
+    
+    def test_target_correlations_matches_pandas(self):
+        """Test SolarAnalyzer._target_correlations against DataFrame.corr()"""
+        from scripts.analysis import SolarAnalyzer
+        
+        analyzer = SolarAnalyzer()
+        for df in (self.data, self.data.dropna(subset=['GHI'])[['GHI', 'DNI', 'Tamb', 'BP']]):
+            with self.subTest(columns=list(df.columns)):
+                expected = df.corr()['GHI']
+                actual = analyzer._target_correlations(df, 'GHI')
+                self.assertEqual(list(actual.index), list(expected.index))
+                np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(),
+                                           rtol=1e-9, atol=1e-12, equal_nan=True)
+    
+    def test_partition_quantile_matches_pandas(self):
+        """Test _partition_quantile against Series.quantile"""
+        from scripts.analysis import _partition_quantile
+        
+        for col in ('GHI', 'TModA', 'BP'):  # NaNs, sparse, constant
+            series = self.data[col]
+            values = series.dropna().to_numpy()
+            for q in (0.0, 0.25, 0.5, 0.95, 1.0):
+                with self.subTest(column=col, q=q):
+                    self.assertAlmostEqual(_partition_quantile(values, q), series.quantile(q), places=9)
 
 class TestConfiguration(unittest.TestCase):
     """Test configuration settings"""